@@ -110,4 +110,5 @@ ENABLE_PROXY = False  # Отключить прокси
 ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', 'True').lower() == 'true'  # Включить автоматическую архивацию
 ARCHIVE_DAYS_TO_KEEP_UNARCHIVED = int(os.getenv('ARCHIVE_DAYS_TO_KEEP_UNARCHIVED', 7))  # Дней для хранения неархивированных файлов
 ARCHIVE_DAYS_TO_KEEP_ARCHIVED = int(os.getenv('ARCHIVE_DAYS_TO_KEEP_ARCHIVED', 90))  # Дней для хранения архивов (3 месяца)
-ARCHIVE_DAILY_TIME = os.getenv('ARCHIVE_DAILY_TIME', '03:00')  # Время ежедневной архивации 
\ No newline at end of file
+ARCHIVE_DAILY_TIME = os.getenv('ARCHIVE_DAILY_TIME', '03:00')  # Время ежедневной архивации
+ARCHIVE_COMPRESSOR = os.getenv('ARCHIVE_COMPRESSOR', 'pigz').lower()  # pigz (если установлен, иначе gzip), gzip или zstd (нужен пакет zstandard)
@@ -2,18 +2,27 @@ from jinja2 import Template
 from datetime import datetime
 import os
 import pandas as pd
-import io
 import re
 import logging
 from typing import cast
 from report.ai_prompt_utils import build_ai_prompt
 from core.ai_advisor import send_to_ai_advisor
-import collections
 from config.config import ENABLE_AI
 import csv
+import atexit
+import collections
+import heapq
+import threading
 
 logger = logging.getLogger(__name__)
 
+_RE_VERTICAL_STATUS = re.compile(r'Status:\n(.*?)$', re.DOTALL)
+_RE_WHITESPACE = re.compile(r'\s+')
+_RE_DATE_IN_NAME = re.compile(r'(\d{4})[-_]?(\d{2})[-_]?(\d{2})')
+
+_CPU_PEAK_PREFIX = '### 📈 Пик CPU в '
+_CPU_LOAD_LABEL = 'Зафиксированная нагрузка:'
+
 REPORT_TEMPLATE = """
 # Отчёт по производительности MySQL
 
@@ -106,6 +115,12 @@ MEMORY_EVENT_TEMPLATE = """
 - **Зафиксированное использование:** `{{ memory_percent }}%`
 """
 
+# Шаблоны компилируются один раз при импорте модуля, а не при каждом рендере
+_REPORT_TPL = Template(REPORT_TEMPLATE)
+_BASELINE_TPL = Template(BASELINE_TEMPLATE)
+_EVENT_HEADER_TPL = Template(EVENT_HEADER_TEMPLATE)
+_MEMORY_EVENT_TPL = Template(MEMORY_EVENT_TEMPLATE)
+
 def parse_innodb_status(status_string):
     """
     Парсит вывод SHOW ENGINE INNODB STATUS, который может быть в двух форматах:
@@ -114,7 +129,7 @@ def parse_innodb_status(status_string):
     """
     if "***************************" in status_string:
         # Вертикальный формат (\\G)
-        match = re.search(r'Status:\n(.*?)$', status_string, re.DOTALL)
+        match = _RE_VERTICAL_STATUS.search(status_string)
         if match:
             return match.group(1).strip()
     else:
@@ -126,15 +141,56 @@ def parse_innodb_status(status_string):
     # Fallback
     return status_string.replace('\\n', '\n').strip()
 
+_MD_ALIGN_FORMAT = {
+    'left': lambda w: ':' + '-' * (w + 1),
+    'right': lambda w: '-' * (w + 1) + ':',
+    'center': lambda w: ':' + '-' * w + ':',
+}
+
+_MD_CELL_FORMAT = {
+    'left': str.ljust,
+    'right': str.rjust,
+    'center': str.center,
+}
+
+def _rows_to_markdown(rows, colalign=None):
+    """
+    Форматирует список строк-списков в markdown-таблицу. Первая строка — заголовок.
+    Если colalign не совпадает по числу столбцов, все столбцы выравниваются по левому краю.
+    """
+    if not rows:
+        return ''
+    ncols = len(rows[0])
+    widths = [max(len(h), 1) for h in rows[0]]
+    for row in rows[1:]:
+        if len(row) > ncols:
+            raise ValueError(f"строка содержит {len(row)} полей вместо {ncols}")
+        if len(row) < ncols:
+            row.extend([''] * (ncols - len(row)))
+        for i, cell in enumerate(row):
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
+    if not colalign or len(colalign) != ncols:
+        colalign = ('left',) * ncols
+
+    def fmt_row(row):
+        return '| ' + ' | '.join(_MD_CELL_FORMAT[a](c, w) for c, w, a in zip(row, widths, colalign)) + ' |'
+
+    lines = [fmt_row(rows[0]), '|' + '|'.join(_MD_ALIGN_FORMAT[a](w) for w, a in zip(widths, colalign)) + '|']
+    lines.extend(fmt_row(row) for row in rows[1:])
+    return '\n'.join(lines)
+
+def _tsv_to_markdown(text, colalign=None):
+    """Преобразует вывод mysql с табуляциями в markdown-таблицу без pandas."""
+    return _rows_to_markdown([line.split('\t') for line in text.splitlines() if line], colalign)
+
 def to_markdown_table(data):
     """Преобразует табличные данные (строка с табуляцией или markdown) в markdown-таблицу."""
     if not data or not isinstance(data, str):
         return data or ''
-    # Если есть табуляции, пробуем через pandas
     if '\t' in data:
         try:
-            df = pd.read_csv(io.StringIO(data), sep='\t', engine='python')
-            return df.to_markdown(index=False)
+            return _tsv_to_markdown(data)
         except Exception as e:
             return f"```\n(ошибка парсинга таблицы: {e})\n{data}\n```"
     return data
@@ -144,20 +200,27 @@ def parse_and_format_free_output(free_output):
     if not free_output or not isinstance(free_output, str):
         return f"```\n{free_output or 'N/A'}\n```"
     try:
-        lines = free_output.strip().splitlines()
-        # Основная таблица памяти
-        main_table = '\n'.join(lines[:3])
-        main_table_md = to_markdown_table(main_table)
+        # Нужны только первые три строки: заголовок, Mem и третья строка (Swap или -/+ buffers/cache)
+        lines = free_output.lstrip('\n').split('\n', 3)
+        header = lines[0].split()
+        # Основная таблица памяти: первый столбец — подписи строк (Mem:, Swap:, -/+ buffers/cache:)
+        table_lines = ['| | ' + ' | '.join(header) + ' |', '|:---|' + '---:|' * len(header)]
+        for line in lines[1:3]:
+            label, _, values = line.partition(':')
+            cells = values.split()
+            cells += [''] * (len(header) - len(cells))
+            table_lines.append(f"| {label.strip()}: | " + ' | '.join(cells) + ' |')
+        main_table_md = '\n'.join(table_lines)
         # Таблица для buffers/cache
-        buffer_line = lines[2]
-        buffer_parts = buffer_line.split()
+        buffer_parts = lines[2].split()
         buffer_used = buffer_parts[2]
         buffer_free = buffer_parts[3]
-        buffer_df = pd.DataFrame([
-            {"Показатель": "Used (-buffers/cache)", "Значение (MB)": buffer_used},
-            {"Показатель": "Free (+buffers/cache)", "Значение (MB)": buffer_free}
-        ])
-        table2 = buffer_df.to_markdown(index=False)
+        table2 = (
+            "| Показатель | Значение (MB) |\n"
+            "|:---|---:|\n"
+            f"| Used (-buffers/cache) | {buffer_used} |\n"
+            f"| Free (+buffers/cache) | {buffer_free} |"
+        )
         return f"{main_table_md}\n\n**Расшифровка `-/+ buffers/cache`:**\n{table2}"
     except Exception as e:
         return f"```\n(ошибка парсинга 'free -m': {e})\n{free_output}\n```"
@@ -168,101 +231,77 @@ def parse_and_format_cpuinfo(cpuinfo_output):
         return f"```\n{cpuinfo_output or 'N/A'}\n```"
     try:
         # --- Блок для выделения информации только по первому процессору ---
-        processor_blocks = cpuinfo_output.strip().split('\n\n')
-        first_block = ""
-        for block in processor_blocks:
-            if block.strip():
-                first_block = block
-                break
-        
-        if not first_block.strip():
-            processor_lines = cpuinfo_output.strip().split('\n')
-            first_block_lines = []
-            for line in processor_lines:
-                if not line.strip() and first_block_lines:
-                    break
-                first_block_lines.append(line)
-            first_block = "\n".join(first_block_lines)
+        # Блоки процессоров разделены пустой строкой: ищем только первую границу
+        text = cpuinfo_output.lstrip()
+        sep = text.find('\n\n')
+        first_block = text[:sep] if sep != -1 else text
 
         if not first_block.strip():
              return f"```\n(не удалось найти блок процессора в cpuinfo)\n{cpuinfo_output}\n```"
         # --- Конец блока ---
 
-        params = []
-        values = []
+        rows = []
         for line in first_block.split('\n'):
             if ':' in line:
-                parts = line.split(':', 1)
-                key = parts[0].strip()
-                value = parts[1].strip()
-                params.append(key)
-                values.append(value)
+                key, value = line.split(':', 1)
+                rows.append([key.strip(), value.strip()])
 
-        if not params:
+        if not rows:
             return f"```\n(не удалось распознать cpuinfo)\n{cpuinfo_output}\n```"
 
-        df = pd.DataFrame({
-            'Параметр': params,
-            'Значение': values
-        })
-        
-        return df.to_markdown(index=False)
+        return _rows_to_markdown([['Параметр', 'Значение']] + rows)
     except Exception as e:
         return f"```\n(ошибка парсинга cpuinfo: {e})\n{cpuinfo_output}\n```"
 
+# Выравнивание столбцов для табличных метрик generate_report
+_TABLE_ALIGNMENTS = {
+    'global_status': ("left", "left"),
+    'global_variables': ("left", "left"),
+    'qcache_status': ("left", "right"),
+    'processlist': ("right", "left", "left", "center", "left", "right", "center", "left")
+}
+
+def _render_tsv(value, key):
+    """Преобразует табличную метрику key в markdown-таблицу, при ошибке — в блок кода."""
+    try:
+        return _tsv_to_markdown(value, _TABLE_ALIGNMENTS.get(key))
+    except Exception:
+        return f"```\n{value}\n```"
+
 def generate_report(metrics, issues, recommendations, output_path=None):
-    processed_metrics = metrics.copy()
-    
-    table_alignments = {
-        'global_status': ("left", "left"),
-        'global_variables': ("left", "left"),
-        'qcache_status': ("left", "right"),
-        'processlist': ("right", "left", "left", "center", "left", "right", "center", "left")
-    }
-    
-    table_keys = list(table_alignments.keys())
+    # Переопределяем только изменённые ключи, исходный metrics не копируется и не мутируется
+    overrides = {}
     
-    for key, value in processed_metrics.items():
+    for key, value in metrics.items():
         if not value or not isinstance(value, str):
             continue
 
-        if key in table_keys and '\t' in value:
-            try:
-                df = pd.read_csv(io.StringIO(value), sep='\t', engine='python')
-                colalign = table_alignments.get(key)
-                if colalign and len(df.columns) != len(colalign):
-                    colalign = None # Fallback to default if column count mismatches
-                processed_metrics[key] = df.to_markdown(index=False, colalign=colalign)
-            except Exception:
-                processed_metrics[key] = f"```\n{value}\n```"
+        if key in _TABLE_ALIGNMENTS and '\t' in value:
+            overrides[key] = _render_tsv(value, key)
 
         elif key == 'innodb_status':
-            processed_metrics[key] = parse_innodb_status(value)
+            overrides[key] = parse_innodb_status(value)
 
-    if 'cpu_spikes' in processed_metrics:
-        for spike in processed_metrics.get('cpu_spikes', []):
+    spikes = metrics.get('cpu_spikes')
+    if spikes:
+        rendered_spikes = []
+        for spike in spikes:
             proc_list = spike.get('processlist_output')
             if proc_list and isinstance(proc_list, str) and '\t' in proc_list:
-                try:
-                    df = pd.read_csv(io.StringIO(proc_list), sep='\t', engine='python')
-                    colalign = table_alignments.get('processlist')
-                    if colalign and len(df.columns) != len(colalign):
-                        colalign = None # Fallback to default
-                    spike['processlist_output'] = df.to_markdown(index=False, colalign=colalign)
-                except Exception:
-                    spike['processlist_output'] = f"```\n{proc_list}\n```"
-
-    template = Template(REPORT_TEMPLATE)
-    report = template.render(
+                spike = dict(spike, processlist_output=_render_tsv(proc_list, 'processlist'))
+            rendered_spikes.append(spike)
+        overrides['cpu_spikes'] = rendered_spikes
+
+    report = _REPORT_TPL.render(
         date=datetime.now().strftime('%Y-%m-%d %H:%M'),
-        metrics=processed_metrics,
+        metrics=collections.ChainMap(overrides, metrics),
         issues=issues,
         recommendations=recommendations
     )
     if output_path:
         abs_path = os.path.join(os.getcwd(), output_path) if not os.path.isabs(output_path) else output_path
         os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-        with open(abs_path, 'w', encoding='utf-8') as f:
+        with open(abs_path, 'w', encoding='utf-8', newline='') as f:
             f.write(report)
     return report 
 
@@ -274,30 +313,95 @@ def generate_baseline_report(metrics, output_path):
         'global_variables': to_markdown_table(metrics.get('global_variables'))
     }
 
-    template = Template(BASELINE_TEMPLATE)
-    report = template.render(
+    report = _BASELINE_TPL.render(
         date=datetime.now().strftime('%Y-%m-%d %H:%M'),
         metrics=processed_metrics
     )
     
-    with open(output_path, 'w', encoding='utf-8') as f:
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
         f.write(report)
 
 def _ensure_header(report_path):
     """Проверяет, существует ли файл и заголовок, и добавляет их при необходимости."""
     date_str = datetime.now().strftime('%Y-%m-%d')
-    header = Template(EVENT_HEADER_TEMPLATE).render(date=date_str)
+    header = _EVENT_HEADER_TPL.render(date=date_str)
     
-    if not os.path.exists(report_path):
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write(header)
-            f.write('\n')
+    # O_EXCL: создание и проверка существования одной атомарной операцией
+    try:
+        fd = os.open(report_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+        f.write(header + '\n')
+
+def _open_for_append(report_path):
+    """
+    Открывает файл на дозапись. Возвращает (файл, created), где created=True,
+    если файл создан этим вызовом (O_EXCL, без гонки с другими писателями).
+    """
+    try:
+        fd = os.open(report_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+        created = True
+    except FileExistsError:
+        fd = os.open(report_path, os.O_WRONLY | os.O_APPEND)
+        created = False
+    return os.fdopen(fd, 'a', encoding='utf-8', newline=''), created
+
+class _CsvAppender:
+    """
+    Держит открытым CSV-файл событий и дописывает в него строки.
+    Файл переоткрывается только при смене пути (новый день), заголовок пишется в новый/пустой файл.
+    """
+
+    def __init__(self, fieldnames):
+        self.fieldnames = fieldnames
+        self._path = None
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def _open(self, path):
+        self._close()
+        # Один open + fstat вместо exists + open: без гонки между проверкой и записью заголовка
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        need_header = os.fstat(fd).st_size == 0
+        self._file = os.fdopen(fd, 'a', newline='', encoding='utf-8', buffering=1 << 16)
+        self._writer = csv.writer(self._file, quoting=csv.QUOTE_ALL)
+        if need_header:
+            self._writer.writerow(self.fieldnames)
+        self._path = path
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+        self._path = None
+        self._file = None
+        self._writer = None
+
+    def writerows(self, path, rows):
+        with self._lock:
+            if self._file is None or path != self._path:
+                self._open(path)
+            self._writer.writerows(rows)
+            # Сбрасываем буфер, чтобы сводный отчёт видел свежие события
+            self._file.flush()
+
+    def writerow(self, path, row):
+        self.writerows(path, [row])
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+_cpu_appender = _CsvAppender(['date', 'time', 'pid', 'cpu', 'user', 'host', 'time_query', 'info'])
+_mem_appender = _CsvAppender(['date', 'time', 'memory_percent'])
+atexit.register(_cpu_appender.close)
+atexit.register(_mem_appender.close)
 
 def append_cpu_event_to_report(event_data, report_path):
     """
     Добавляет информацию о пике CPU в отчет о событиях (markdown, как раньше) и в CSV (плоский формат: одна строка на каждый запрос, info без переносов строк).
     """
-    import re
     try:
         os.makedirs(os.path.dirname(report_path), exist_ok=True)
         # Новый путь для событий по дням
@@ -305,7 +409,6 @@ def append_cpu_event_to_report(event_data, report_path):
         os.makedirs(events_dir, exist_ok=True)
         date_str = datetime.now().strftime('%Y-%m-%d')
         csv_path = os.path.join(events_dir, f'{date_str}.csv')
-        csv_exists = os.path.exists(csv_path)
         process_list = event_data.get('process_list', '')
         # --- Парсим process_list для CSV ---
         queries = []
@@ -325,45 +428,44 @@ def append_cpu_event_to_report(event_data, report_path):
                     time_idx = header_line.index('TIME')
                     info_idx = header_line.index('INFO')
 
-                    for line in lines:
-                        if line.startswith('|') and not line.startswith('+-') and 'USER' not in line.upper():
-                            parts = [p.strip() for p in line.split('|')[1:-1]]
-                            if len(parts) > max(user_idx, host_idx, time_idx, info_idx):
-                                user = parts[user_idx]
-                                host = parts[host_idx]
-                                time_val = parts[time_idx]
-                                info = parts[info_idx].replace('\n', ' ').replace('\r', ' ')
-                                info = re.sub(r'\s+', ' ', info)
-                                if info and info != 'NULL':
-                                    queries.append({'user': user, 'host': host, 'time_query': time_val, 'info': info})
+                    max_idx = max(user_idx, host_idx, time_idx, info_idx)
+
+                    # Разбираем все строки таблицы одним векторным проходом pandas
+                    rows = pd.Series(lines, dtype=object)
+                    rows = rows[rows.str.startswith('|') & ~rows.str.upper().str.contains('USER', regex=False)]
+                    # Как и line.split('|')[1:-1]: крайние части вне '|' не считаются полями
+                    rows = rows[rows.str.count(r'\|') - 1 > max_idx]
+                    if not rows.empty:
+                        cells = rows.str.split('|', expand=True)
+                        df = cells[[user_idx + 1, host_idx + 1, time_idx + 1, info_idx + 1]].apply(lambda c: c.str.strip())
+                        df.columns = ['user', 'host', 'time_query', 'info']
+                        df['info'] = df['info'].str.replace(r'\s+', ' ', regex=True)
+                        df = df[df['info'].ne('NULL') & df['info'].ne('')]
+                        queries = df.to_dict('records')
                 except ValueError:
                     logger.warning("Не удалось найти все необходимые столбцы (USER, HOST, TIME, INFO) в выводе processlist.")
                 except Exception as e:
-                    logger.error(f"Ошибка при парсинге processlist: {e}", exc_info=True)
+                    logger.error("Ошибка при парсинге processlist: %s", e)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Трассировка ошибки парсинга processlist", exc_info=True)
 
 
         # --- Запись в CSV ---
         if queries:
-            with open(csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['date', 'time', 'pid', 'cpu', 'user', 'host', 'time_query', 'info']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-                if not csv_exists:
-                    writer.writeheader()
-                for q in queries:
-                    writer.writerow({
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'time': event_data['time'],
-                        'pid': event_data['pid'],
-                        'cpu': event_data['cpu'],
-                        'user': q['user'],
-                        'host': q['host'],
-                        'time_query': q['time_query'],
-                        'info': q['info'],
-                    })
+            _cpu_appender.writerows(csv_path, [
+                (
+                    date_str,
+                    event_data['time'],
+                    event_data['pid'],
+                    event_data['cpu'],
+                    q['user'],
+                    q['host'],
+                    q['time_query'],
+                    q['info'],
+                )
+                for q in queries
+            ])
         # --- Markdown-отчёт (как раньше) ---
-        if not os.path.exists(report_path):
-            with open(report_path, 'w', encoding='utf-8') as f:
-                f.write("# 📊 Отчет о событиях мониторинга MySQL\n\n")
         time_str = event_data['time']
         cpu_usage = event_data['cpu']
         pid = event_data['pid']
@@ -379,7 +481,7 @@ def append_cpu_event_to_report(event_data, report_path):
             )
         else:
             processlist_md = 'Нет активных запросов.'
-        event_entry = f"""
+        parts = [f"""
 ---
 ### 📈 Пик CPU в {time_str}
 - **PID процесса:** `{pid}`
@@ -388,10 +490,10 @@ def append_cpu_event_to_report(event_data, report_path):
 **Топ-5 запросов по времени выполнения в момент пика:**
 {processlist_md}
 
-"""
+"""]
         performance_analysis = event_data.get('performance_analysis')
         if performance_analysis:
-            event_entry += f"""
+            parts.append(f"""
 **📊 Анализ производительности запросов:**
 - **Всего активных запросов:** {performance_analysis['total_queries']}
 - **Максимальное время выполнения:** {performance_analysis['max_time']} сек
@@ -399,26 +501,32 @@ def append_cpu_event_to_report(event_data, report_path):
 - **Медленных запросов (>10 сек):** {len(performance_analysis['slow_queries'])}
 - **Критически медленных запросов (>30 сек):** {len(performance_analysis['critical_queries'])}
 
-"""
+""")
             if performance_analysis['critical_queries']:
-                event_entry += "**🚨 Критически медленные запросы (>30 сек):**\n"
-                for query in performance_analysis['critical_queries']:
-                    info = str(query.get('INFO', 'N/A')).replace('\n', ' ').replace('\r', ' ')
-                    info = re.sub(r'\s+', ' ', info)
-                    event_entry += f"- **{query['TIME']} сек:** {info[:100]}...\n"
-                event_entry += "\n"
+                listed_title = "**🚨 Критически медленные запросы (>30 сек):**\n"
+                listed_queries = performance_analysis['critical_queries']
             elif performance_analysis['slow_queries']:
-                event_entry += "**⚠️ Медленные запросы (>10 сек):**\n"
-                for query in performance_analysis['slow_queries']:
-                    info = str(query.get('INFO', 'N/A')).replace('\n', ' ').replace('\r', ' ')
-                    info = re.sub(r'\s+', ' ', info)
-                    event_entry += f"- **{query['TIME']} сек:** {info[:100]}...\n"
-                event_entry += "\n"
-        with open(report_path, 'a', encoding='utf-8') as f:
-            f.write(event_entry)
-        logger.info(f"Информация о пике CPU добавлена в отчет: {report_path}")
+                listed_title = "**⚠️ Медленные запросы (>10 сек):**\n"
+                listed_queries = performance_analysis['slow_queries']
+            else:
+                listed_queries = None
+            if listed_queries:
+                parts.append(listed_title)
+                for query in listed_queries:
+                    # \s+ уже покрывает \n, \r и \t — отдельная замена управляющих символов не нужна
+                    info = _RE_WHITESPACE.sub(' ', str(query.get('INFO', 'N/A')))
+                    parts.append(f"- **{query['TIME']} сек:** {info[:100]}...\n")
+                parts.append("\n")
+        f, created = _open_for_append(report_path)
+        with f:
+            if created:
+                parts.insert(0, "# 📊 Отчет о событиях мониторинга MySQL\n\n")
+            f.write(''.join(parts))
+        logger.info("Информация о пике CPU добавлена в отчет: %s", report_path)
     except Exception as e:
-        logger.error(f"Ошибка при добавлении информации о пике CPU в отчет: {e}", exc_info=True)
+        logger.error("Ошибка при добавлении информации о пике CPU в отчет: %s", e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Трассировка ошибки добавления пика CPU", exc_info=True)
 
 def append_memory_event_to_report(event_data, output_path):
     """Добавляет в отчет событие о высоком потреблении памяти и в CSV по дням (events/memory/YYYY-MM-DD.csv)."""
@@ -428,135 +536,165 @@ def append_memory_event_to_report(event_data, output_path):
     os.makedirs(events_dir, exist_ok=True)
     date_str = datetime.now().strftime('%Y-%m-%d')
     csv_path = os.path.join(events_dir, f'{date_str}.csv')
-    csv_exists = os.path.exists(csv_path)
-    with open(csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile, quoting=csv.QUOTE_ALL)
-        if not csv_exists:
-            writer.writerow(['date', 'time', 'memory_percent'])
-        writer.writerow([
-            date_str,
-            event_data['time'],
-            event_data['memory_percent']
-        ])
-    template = Template(MEMORY_EVENT_TEMPLATE)
-    report_content = template.render(
+    _mem_appender.writerow(csv_path, [
+        date_str,
+        event_data['time'],
+        event_data['memory_percent']
+    ])
+    report_content = _MEMORY_EVENT_TPL.render(
         time=event_data['time'],
         memory_percent=event_data['memory_percent']
     )
-    with open(output_path, 'a', encoding='utf-8') as f:
+    with open(output_path, 'a', encoding='utf-8', newline='') as f:
         f.write(report_content)
 
 def check_if_memory_event_exists(report_path):
     """Проверяет, было ли уже сегодня событие по памяти."""
     if not os.path.exists(report_path):
         return False
+    # Читаем построчно и выходим на первом совпадении, не загружая файл целиком
     with open(report_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    return 'Высокое потребление памяти' in content 
+        for line in f:
+            if 'Высокое потребление памяти' in line:
+                return True
+    return False
+
+def _update_online_stats(stats, value):
+    """Обновляет накопитель [count, sum, max, min] очередным значением."""
+    stats[0] += 1
+    stats[1] += value
+    if stats[2] is None or value > stats[2]:
+        stats[2] = value
+    if stats[3] is None or value < stats[3]:
+        stats[3] = value
+
+def _online_stats_to_agg(stats):
+    """Преобразует накопитель [count, sum, max, min] в словарь max/min/avg/count."""
+    count, total, max_value, min_value = stats
+    return {
+        'max': max_value,
+        'min': min_value,
+        'avg': total/count if count else None,
+        'count': count
+    }
 
-def parse_and_aggregate_events(events_path):
+def parse_and_aggregate_events(events_path, top_n=None):
     """
     Парсит events_report_YYYYMMDD.md и агрегирует:
     - загрузку CPU (макс/мин/среднее)
     - все запросы (группирует похожие по INFO)
     - медленные/критические запросы (медленные >1 сек)
     - статистику по времени выполнения
+    Если задан top_n, в grouped_queries попадают только top_n самых частых групп.
     """
     if not os.path.exists(events_path):
         logger.warning(f"Файл событий не найден: {events_path}")
         return {}
     
-    with open(events_path, encoding='utf-8') as f:
-        text = f.read()
-    
-    logger.info(f"Парсинг файла событий: {events_path}, размер: {len(text)} символов")
+    logger.info(f"Парсинг файла событий: {events_path}, размер: {os.path.getsize(events_path)} байт")
     
-    # Парсим пики CPU
-    cpu_usages = []
-    all_queries = []
+    # Все статистики считаются онлайн за один проход: [count, sum, max, min]
+    cpu_stats = [0, 0, None, None]
+    query_time_stats = [0, 0, None, None]
+    # Группы по INFO: [count, sum_time, max_time, min_time]
+    query_groups = {}
     slow_queries = []
     critical_queries = []
-    query_times = []
-    query_groups = collections.defaultdict(list)
     
-    # Ищем все пики CPU по заголовкам ### 📈 Пик CPU
-    cpu_peaks = re.findall(r'### 📈 Пик CPU в (\d{2}:\d{2}:\d{2})[\s\S]*?Зафиксированная нагрузка:\s*`([\d\.]+)%`', text)
-    logger.info(f"Найдено пиков CPU по заголовкам: {len(cpu_peaks)}")
-    
-    for time_str, cpu_usage in cpu_peaks:
-        cpu_usage = float(cpu_usage)
-        cpu_usages.append(cpu_usage)
-        logger.info(f"Найден пик CPU в {time_str}: {cpu_usage}%")
-    
-    # Ищем таблицы запросов
-    table_matches = re.findall(r'\|\s*ID\s*\|.*?\n((?:\|.*?\n)+)', text, re.DOTALL)
-    logger.info(f"Найдено таблиц запросов: {len(table_matches)}")
-    
-    for i, table in enumerate(table_matches):
-        logger.info(f"Обрабатываю таблицу {i+1}")
-        # Парсим строки таблицы
-        for line in table.strip().split('\n'):
-            if not line.strip().startswith('|'):
+    # Один линейный проход по строкам: заголовки пиков CPU и таблицы запросов (| ID | ...)
+    pending_peak_time = None
+    in_table = False
+    tables_count = 0
+    with open(events_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if in_table:
+                if line.startswith('+'):
+                    # Строка-разделитель таблицы mysql
+                    continue
+                if not line.startswith('|'):
+                    in_table = False
+            elif line.lstrip().startswith('| ID '):
+                in_table = True
+                tables_count += 1
+                logger.info(f"Обрабатываю таблицу {tables_count}")
+                continue
+
+            if not in_table:
+                if line.startswith(_CPU_PEAK_PREFIX):
+                    pending_peak_time = line[len(_CPU_PEAK_PREFIX):].strip()
+                elif pending_peak_time is not None and _CPU_LOAD_LABEL in line:
+                    start = line.find('`', line.find(_CPU_LOAD_LABEL))
+                    end = line.find('%', start + 1)
+                    if start != -1 and end != -1:
+                        try:
+                            cpu_usage = float(line[start + 1:end])
+                            _update_online_stats(cpu_stats, cpu_usage)
+                            logger.info(f"Найден пик CPU в {pending_peak_time}: {cpu_usage}%")
+                        except ValueError:
+                            pass
+                    pending_peak_time = None
                 continue
+
+            # Строка таблицы запросов
             parts = [p.strip() for p in line.strip('|').split('|')]
             if len(parts) < 7:
                 continue
             try:
                 q_id, user, host, db, command, time_val, state, info = parts[:8]
                 time_val = int(time_val)
-                query = {
-                    'ID': q_id,
-                    'USER': user,
-                    'HOST': host,
-                    'DB': db,
-                    'COMMAND': command,
-                    'TIME': time_val,
-                    'STATE': state,
-                    'INFO': info
-                }
-                all_queries.append(query)
-                query_times.append(time_val)
+                _update_online_stats(query_time_stats, time_val)
                 # Группируем по INFO (обрезаем до 100 символов для группировки)
                 group_key = info[:100]
-                query_groups[group_key].append(query)
-                if time_val > 30:
-                    critical_queries.append(query)
-                elif time_val > 1:
-                    slow_queries.append(query)
+                group = query_groups.get(group_key)
+                if group is None:
+                    query_groups[group_key] = [1, time_val, time_val, time_val]
+                else:
+                    _update_online_stats(group, time_val)
+                # Полный словарь запроса нужен только для медленных/критических
+                if time_val > 1:
+                    query = {
+                        'ID': q_id,
+                        'USER': user,
+                        'HOST': host,
+                        'DB': db,
+                        'COMMAND': command,
+                        'TIME': time_val,
+                        'STATE': state,
+                        'INFO': info
+                    }
+                    if time_val > 30:
+                        critical_queries.append(query)
+                    else:
+                        slow_queries.append(query)
             except Exception as e:
                 logger.debug(f"Ошибка парсинга строки таблицы: {e}")
-                continue
     
-    logger.info(f"Найдено пиков CPU: {len(cpu_usages)}")
-    logger.info(f"Найдено запросов: {len(all_queries)}")
+    logger.info(f"Найдено таблиц запросов: {tables_count}")
+    logger.info(f"Найдено пиков CPU: {cpu_stats[0]}")
+    logger.info(f"Найдено запросов: {query_time_stats[0]}")
     logger.info(f"Медленных запросов: {len(slow_queries)}")
     logger.info(f"Критических запросов: {len(critical_queries)}")
     
     # Агрегаты
-    cpu_agg = {
-        'max': max(cpu_usages) if cpu_usages else None,
-        'min': min(cpu_usages) if cpu_usages else None,
-        'avg': sum(cpu_usages)/len(cpu_usages) if cpu_usages else None,
-        'count': len(cpu_usages)
-    }
-    query_time_agg = {
-        'max': max(query_times) if query_times else None,
-        'min': min(query_times) if query_times else None,
-        'avg': sum(query_times)/len(query_times) if query_times else None,
-        'count': len(query_times)
-    }
-    # Группировка похожих запросов
-    grouped_queries = []
-    for key, group in query_groups.items():
-        grouped_queries.append({
+    cpu_agg = _online_stats_to_agg(cpu_stats)
+    query_time_agg = _online_stats_to_agg(query_time_stats)
+    # Группировка похожих запросов, по убыванию количества
+    if top_n is not None:
+        # Частичный отбор через кучу вместо полной сортировки
+        top_groups = heapq.nlargest(top_n, query_groups.items(), key=lambda kv: kv[1][0])
+    else:
+        top_groups = sorted(query_groups.items(), key=lambda kv: kv[1][0], reverse=True)
+    grouped_queries = [
+        {
             'INFO': key,
-            'count': len(group),
-            'avg_time': sum(q['TIME'] for q in group)/len(group),
-            'max_time': max(q['TIME'] for q in group),
-            'min_time': min(q['TIME'] for q in group)
-        })
-    # Сортируем по количеству
-    grouped_queries = sorted(grouped_queries, key=lambda x: x['count'], reverse=True)
+            'count': count,
+            'avg_time': sum_time/count,
+            'max_time': max_time,
+            'min_time': min_time
+        }
+        for key, (count, sum_time, max_time, min_time) in top_groups
+    ]
     return {
         'cpu_agg': cpu_agg,
         'query_time_agg': query_time_agg,
@@ -565,16 +703,24 @@ def parse_and_aggregate_events(events_path):
         'critical_queries': critical_queries
     }
 
+_CPU_SUMMARY_COLUMNS = ['date', 'cpu', 'user', 'host', 'time_query', 'info']
+# time_query читается как есть и приводится через to_numeric(errors='coerce')
+_CPU_SUMMARY_DTYPES = {
+    'date': 'string',
+    'cpu': 'float64',
+    'user': 'category',
+    'host': 'category',
+    'info': 'string'
+}
+
 def generate_daily_summary_report(baseline_path, events_path, output_path):
     """
     Генерирует итоговый дневной отчёт с AI-рекомендациями и агрегированной сводкой.
     Теперь всегда использует events/cpu/YYYY-MM-DD.csv и events/memory/YYYY-MM-DD.csv (плоский формат) для CPU и памяти.
     Дата берётся из имени выходного файла (output_path), а не из текущей даты.
     """
-    import pandas as pd
-    import re
     # Извлекаем дату из output_path (например, daily_summary_20250627.md -> 2025-06-27)
-    date_match = re.search(r'(\d{4})[-_]?(\d{2})[-_]?(\d{2})', output_path)
+    date_match = _RE_DATE_IN_NAME.search(output_path)
     if date_match:
         date_str = f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
     else:
@@ -594,7 +740,12 @@ def generate_daily_summary_report(baseline_path, events_path, output_path):
     cpu_summary = ''
     mem_summary = ''
     if os.path.exists(cpu_csv):
-        df = pd.read_csv(cpu_csv)
+        # Читаем только нужные для сводки столбцы, с компактными типами
+        df = pd.read_csv(
+            cpu_csv,
+            usecols=_CPU_SUMMARY_COLUMNS,
+            dtype=_CPU_SUMMARY_DTYPES
+        )
         df = df[df['date'] == date_str]
         if not df.empty:
             cpu_summary = (
@@ -614,7 +765,7 @@ def generate_daily_summary_report(baseline_path, events_path, output_path):
             )
             # Топ-5 долгих запросов
             if not df.empty and 'time_query' in df.columns:
-                top_long = df.sort_values(by='time_query', ascending=False).head(5) # type: ignore
+                top_long = df.nlargest(5, 'time_query')
             else:
                 top_long = pd.DataFrame()
             top_long_str = '\n'.join([
@@ -626,7 +777,7 @@ def generate_daily_summary_report(baseline_path, events_path, output_path):
                 avg_cpu=('cpu', 'mean')
             )
             if not top_freq_df.empty:
-                top_freq_df = top_freq_df.sort_values(by='count', ascending=False).head(5) # type: ignore
+                top_freq_df = top_freq_df.nlargest(5, 'count')
                 top_freq_str = '\n'.join([
                     f"  - {str(info)[:100]}... (всего: {row['count']}, ср. CPU: {row['avg_cpu']:.1f}%)" 
                     for info, row in top_freq_df.iterrows()
@@ -636,7 +787,7 @@ def generate_daily_summary_report(baseline_path, events_path, output_path):
 
             cpu_summary += f"\n{query_time_agg}\n**Топ-5 долгих запросов:**\n{top_long_str}\n\n**Топ-5 частых запросов:**\n{top_freq_str}\n"
     if os.path.exists(mem_csv):
-        dfm = pd.read_csv(mem_csv)
+        dfm = pd.read_csv(mem_csv, usecols=['date', 'memory_percent'], dtype={'date': 'string'})
         dfm = dfm[dfm['date'] == date_str]
         if not dfm.empty:
             mem_summary = (
@@ -662,6 +813,6 @@ def generate_daily_summary_report(baseline_path, events_path, output_path):
 ## AI-рекомендации (сгенерировано нейросетью)
 {ai_recommendations}
 """
-    with open(output_path, 'w', encoding='utf-8') as f:
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
         f.write(report)
     return report 
\ No newline at end of file
@@ -4,13 +4,22 @@
 
 Функционал:
 - Архивация файлов старше ARCHIVE_DAYS_TO_KEEP_UNARCHIVED дней
-- Группировка файлов по месяцам в .tar.gz архивы
+- Группировка файлов по месяцам в .tar.gz (или .tar.zst) архивы
 - Удаление архивов старше ARCHIVE_DAYS_TO_KEEP_ARCHIVED дней
 """
 
+import fnmatch
+import functools
+import io
 import os
+import re
+import shutil
+import subprocess
 import tarfile
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
 import logging
@@ -24,9 +33,15 @@ from config.config import (
     LOGS_DIR,
     ARCHIVE_ENABLED,
     ARCHIVE_DAYS_TO_KEEP_UNARCHIVED,
-    ARCHIVE_DAYS_TO_KEEP_ARCHIVED
+    ARCHIVE_DAYS_TO_KEEP_ARCHIVED,
+    ARCHIVE_COMPRESSOR
 )
 
+try:
+    import zstandard
+except ImportError:  # Опционально: нужен только для ARCHIVE_COMPRESSOR=zstd
+    zstandard = None
+
 # Настраиваем логирование
 logger = logging.getLogger('mysql_perf_reporter.archive')
 if not logger.handlers:
@@ -37,67 +52,232 @@ if not logger.handlers:
     logger.setLevel(logging.INFO)
 
 
-def get_file_age_days(file_path):
-    """Возвращает возраст файла в днях."""
-    try:
-        mtime = os.path.getmtime(file_path)
-        file_date = datetime.fromtimestamp(mtime)
-        age = datetime.now() - file_date
-        return age.days
-    except Exception as e:
-        logger.error(f"Ошибка при получении возраста файла {file_path}: {e}")
-        return 0
+def _age_days_from_mtime(mtime, now_ts):
+    """Возвращает возраст файла в днях по времени модификации (mtime) и текущему времени (now_ts)."""
+    return (now_ts - mtime) / 86400.0
+
+
+# Дата в имени файла: events_report_20250627.md, daily_summary_20250627.md,
+# mysql_perf_reporter.log.20250627, mysql_perf_reporter_20250627.log, 2025-06-27.csv.
+# Каждая альтернатива дает пару групп (год, месяц).
+_DATE_FROM_NAME_RE = re.compile(
+    r'(?:events_report_|daily_summary_)([0-9]{4})([0-9]{2})[0-9]{2}\.md$'
+    r'|mysql_perf_reporter\.log\.([0-9]{4})([0-9]{2})[0-9]{2}$'
+    r'|mysql_perf_reporter_([0-9]{4})([0-9]{2})[0-9]{2}\.log$'
+    r'|([0-9]{4})-?([0-9]{2})-?[0-9]{2}\.csv$'
+)
 
 
 def group_files_by_month(files):
     """
     Группирует файлы по месяцам на основе даты в имени файла.
+    Принимает кортежи (путь, имя файла, mtime) из прохода scandir;
+    mtime используется, только если дату из имени извлечь не удалось.
     Возвращает словарь: {(год, месяц): [файлы]}
     """
     grouped = defaultdict(list)
     
-    for file_path in files:
-        filename = os.path.basename(file_path)
-        
-        # Извлекаем дату из имени файла (например, events_report_20250627.md -> 20250627)
-        # или mysql_perf_reporter.log.20250627 -> 20250627
-        date_str = None
-        
-        # Паттерны для разных типов файлов
-        if 'events_report_' in filename or 'daily_summary_' in filename:
-            # events_report_20250627.md или daily_summary_20250627.md
-            parts = filename.split('_')
-            if len(parts) >= 3:
-                date_str = parts[-1].replace('.md', '')
-        elif 'mysql_perf_reporter.log.' in filename:
-            # mysql_perf_reporter.log.20250627
-            date_str = filename.split('.')[-1]
-        elif filename.startswith('mysql_perf_reporter_'):
-            # mysql_perf_reporter_20250627.log
-            date_str = filename.replace('mysql_perf_reporter_', '').replace('.log', '')
-        elif filename.endswith('.csv'):
-            # 2025-06-27.csv (формат для CPU/Memory events)
-            date_str = filename.replace('.csv', '').replace('-', '')
-        
-        if date_str and len(date_str) == 8 and date_str.isdigit():
-            try:
-                year = int(date_str[:4])
-                month = int(date_str[4:6])
-                grouped[(year, month)].append(file_path)
-            except ValueError:
-                logger.warning(f"Не удалось извлечь дату из файла: {filename}")
+    for file_path, filename, mtime in files:
+        match = _DATE_FROM_NAME_RE.match(filename)
+        if match:
+            groups = match.groups()
+            for i in range(0, len(groups), 2):
+                if groups[i] is not None:
+                    grouped[(int(groups[i]), int(groups[i + 1]))].append(file_path)
+                    break
         else:
             # Если не удалось извлечь дату из имени, используем дату модификации
-            try:
-                mtime = os.path.getmtime(file_path)
-                file_date = datetime.fromtimestamp(mtime)
-                grouped[(file_date.year, file_date.month)].append(file_path)
-            except Exception as e:
-                logger.warning(f"Не удалось определить дату для файла {filename}: {e}")
+            file_date = datetime.fromtimestamp(mtime)
+            grouped[(file_date.year, file_date.month)].append(file_path)
     
     return grouped
 
 
+# Размер буфера копирования содержимого файлов в tar (по умолчанию в tarfile 16 КиБ)
+_TAR_COPY_BUFSIZE = 1 << 20
+# Уровни сжатия: архивы удаляются через ARCHIVE_DAYS_TO_KEEP_ARCHIVED дней,
+# поэтому важнее скорость, чем последние проценты степени сжатия
+_GZIP_LEVEL = 1
+_ZSTD_LEVEL = 3
+
+
+def _resolve_compressor():
+    """Компрессор из ARCHIVE_COMPRESSOR с учетом того, что реально доступно: 'pigz', 'gzip' или 'zstd'."""
+    if ARCHIVE_COMPRESSOR == 'zstd':
+        if zstandard is not None:
+            return 'zstd'
+        logger.warning("ARCHIVE_COMPRESSOR=zstd, но пакет zstandard не установлен. Использую gzip.")
+        return 'gzip'
+    if ARCHIVE_COMPRESSOR == 'pigz':
+        return 'pigz' if shutil.which('pigz') else 'gzip'
+    if ARCHIVE_COMPRESSOR != 'gzip':
+        logger.warning("Неизвестный ARCHIVE_COMPRESSOR=%s. Использую gzip.", ARCHIVE_COMPRESSOR)
+    return 'gzip'
+
+
+@contextmanager
+def _open_tar_writer(archive_path, compressor, threads):
+    """
+    Открывает архив на запись. Пишет во временный archive_path + '.tmp' и переименовывает
+    его только после успешной записи: битый архив под настоящим именем при следующем
+    запуске приняли бы за готовый и удалили бы незаархивированные файлы месяца.
+    """
+    tmp_path = archive_path + '.tmp'
+    try:
+        with _open_compressed_tar(tmp_path, compressor, threads) as tar:
+            yield tar
+        os.replace(tmp_path, archive_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def _open_compressed_tar(archive_path, compressor, threads):
+    """
+    Открывает tar со сжатием на запись.
+    pigz: tar пишется потоком (w|) в stdin pigz и сжимается в threads потоков;
+    zstd: поток в ZstdCompressor на threads потоков; gzip: встроенный однопоточный gzip из tarfile.
+    """
+    if compressor == 'gzip':
+        with tarfile.open(archive_path, 'w:gz', compresslevel=_GZIP_LEVEL, copybufsize=_TAR_COPY_BUFSIZE) as tar:
+            yield tar
+        return
+
+    if compressor == 'zstd':
+        with open(archive_path, 'wb') as raw, \
+             zstandard.ZstdCompressor(level=_ZSTD_LEVEL, threads=threads).stream_writer(raw) as zw, \
+             tarfile.open(fileobj=zw, mode='w|', copybufsize=_TAR_COPY_BUFSIZE) as tar:
+            yield tar
+        return
+
+    proc = None
+    try:
+        with open(archive_path, 'wb') as out:
+            proc = subprocess.Popen(
+                [shutil.which('pigz') or 'pigz', f'-{_GZIP_LEVEL}', '-p', str(threads)],
+                stdin=subprocess.PIPE, stdout=out,
+            )
+        with tarfile.open(fileobj=proc.stdin, mode='w|', copybufsize=_TAR_COPY_BUFSIZE) as tar:
+            yield tar
+        proc.stdin.close()
+        rc = proc.wait()
+        if rc != 0:
+            raise RuntimeError(f"pigz завершился с кодом {rc}")
+    except BaseException:
+        # pigz мог не запуститься (OSError) — тогда убивать нечего
+        if proc is not None:
+            proc.kill()
+            proc.wait()
+        raise
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_name_patterns(patterns):
+    """Один регэксп на кортеж glob-шаблонов имен файлов (совпадение с любым из них)."""
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+def _archive_name(directory, year, month, compressor):
+    """Имя месячного архива для директории."""
+    ext = '.tar.zst' if compressor == 'zstd' else '.tar.gz'
+    return f"{os.path.basename(directory)}_{year}_{month:02d}{ext}"
+
+
+def _unlink_many(paths):
+    """
+    Удаляет файлы пачкой. Возвращает (число удаленных, список (путь, ошибка)).
+    Построчно пишет только в DEBUG.
+    """
+    ok_count = 0
+    errors = []
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            errors.append((path, e))
+            continue
+        ok_count += 1
+        logger.debug("Удален файл: %s", path)
+    return ok_count, errors
+
+
+def _log_unlink_summary(directory, ok_count, errors):
+    """Одна итоговая строка по удалению вместо строки на каждый файл."""
+    logger.info("Удалено заархивированных файлов из %s: %d; ошибок: %d", directory, ok_count, len(errors))
+    if errors:
+        logger.error("Не удалось удалить файлы: %s", "; ".join(f"{path}: {e}" for path, e in errors))
+
+
+# Файлы не больше этого размера читаются целиком заранее, пока сжимается предыдущий
+_PREFETCH_MAX_BYTES = 1 << 20
+
+
+def _read_for_tar(tar, file_path):
+    """
+    Возвращает (TarInfo, содержимое, открытый файл) для файла.
+    Содержимое читается заранее только для обычных файлов не больше _PREFETCH_MAX_BYTES.
+    Большой файл возвращается открытым: размер в заголовке и поток данных берутся из одного fd,
+    закрывает его вызывающий. Для жестких ссылок (LNKTYPE) данных нет — (TarInfo, None, None).
+    """
+    fobj = open(file_path, 'rb', buffering=0)
+    try:
+        # Один fstat на открытый файл вместо lstat в tar.add
+        tarinfo = tar.gettarinfo(arcname=os.path.basename(file_path), fileobj=fobj)
+        if tarinfo is None or not tarinfo.isreg():
+            fobj.close()
+            return tarinfo, None, None
+        if tarinfo.size > _PREFETCH_MAX_BYTES:
+            return tarinfo, None, fobj
+        data = fobj.readall()
+        fobj.close()
+    except BaseException:
+        fobj.close()
+        raise
+    tarinfo.size = len(data)
+    return tarinfo, data, None
+
+
+def _archive_one_month(directory, archive_dir, year, month, files, compressor, threads):
+    """
+    Создает архив за один месяц, сжимая его в threads потоков (для pigz/zstd).
+    Может выполняться в рабочем потоке, поэтому не логирует, а возвращает
+    (имя архива, добавленные файлы, ошибка или None).
+    """
+    archive_name = _archive_name(directory, year, month, compressor)
+    archive_path = os.path.join(archive_dir, archive_name)
+    added = []
+    try:
+        ordered = sorted(files)
+        # Чтение следующего файла в фоновом потоке перекрывается со сжатием текущего.
+        # gettarinfo вызывается только из этого одного потока.
+        with _open_tar_writer(archive_path, compressor, threads) as tar, \
+             ThreadPoolExecutor(max_workers=1) as reader:
+            next_read = reader.submit(_read_for_tar, tar, ordered[0]) if ordered else None
+            for i in range(len(ordered)):
+                tarinfo, data, fobj = next_read.result()
+                if i + 1 < len(ordered):
+                    next_read = reader.submit(_read_for_tar, tar, ordered[i + 1])
+                if tarinfo is None:
+                    # Неподдерживаемый тип файла (сокет и т.п.) — tar.add тоже пропускал такие
+                    continue
+                if data is not None:
+                    tar.addfile(tarinfo, io.BytesIO(data))
+                elif fobj is not None:
+                    with fobj:
+                        tar.addfile(tarinfo, fobj)
+                else:
+                    # Жесткая ссылка на уже добавленный файл: только заголовок, без данных
+                    tar.addfile(tarinfo)
+                added.append(tarinfo.name)
+    except Exception as e:
+        return archive_name, [], f"Ошибка при создании архива {archive_path}: {e}"
+    return archive_name, added, None
+
+
 def archive_directory_files(directory, archive_subdir, file_patterns=None, exclude_patterns=None):
     """
     Архивирует старые файлы из директории.
@@ -105,101 +285,127 @@ def archive_directory_files(directory, archive_subdir, file_patterns=None, exclu
     Args:
         directory: Путь к директории для архивации
         archive_subdir: Имя поддиректории для архивов (например, 'archive')
-        file_patterns: Список шаблонов файлов для архивации (например, ['*.md', '*.log'])
-        exclude_patterns: Список шаблонов для исключения
+        file_patterns: Список glob-шаблонов имен файлов для архивации (например, ['*.md', '*.log'])
+        exclude_patterns: Список точных имен файлов для исключения
     """
     if not os.path.exists(directory):
-        logger.warning(f"Директория {directory} не существует. Пропускаю.")
+        logger.warning("Директория %s не существует. Пропускаю.", directory)
         return
     
     archive_dir = os.path.join(directory, archive_subdir)
     os.makedirs(archive_dir, exist_ok=True)
     
-    cutoff_date = datetime.now() - timedelta(days=ARCHIVE_DAYS_TO_KEEP_UNARCHIVED)
+    # Файлы с mtime новее порога не трогаем: сравниваем float без создания datetime на каждый файл
+    cutoff_mtime = time.time() - ARCHIVE_DAYS_TO_KEEP_UNARCHIVED * 86400
+    
+    exclude_names = set(exclude_patterns or ())
+    # Шаблоны — glob по имени файла: '*.csv' не совпадает с 'foo.csv.bak'.
+    # Дубликаты шаблонов убираем, все шаблоны проверяются одним скомпилированным регэкспом
+    name_re = _compile_name_patterns(tuple(sorted(set(file_patterns)))) if file_patterns else None
     
     # Собираем файлы для архивации
     files_to_archive = []
     
-    for item in os.listdir(directory):
-        item_path = os.path.join(directory, item)
-        
-        # Пропускаем директории и файлы в директории archive
-        if os.path.isdir(item_path):
-            continue
-        
-        # Проверяем возраст файла
-        age_days = get_file_age_days(item_path)
-        if age_days < ARCHIVE_DAYS_TO_KEEP_UNARCHIVED:
-            continue
-        
-        # Проверяем шаблоны (если указаны)
-        if file_patterns:
-            # Проверяем, содержит ли имя файла хотя бы один из паттернов
-            pattern_match = False
-            for pattern in file_patterns:
-                clean_pattern = pattern.replace('*', '')
-                if clean_pattern in item:
-                    pattern_match = True
-                    break
-            if not pattern_match:
+    # scandir отдает тип файла из readdir и кэширует stat, без отдельных isdir/getmtime на каждый файл
+    with os.scandir(directory) as it:
+        for entry in it:
+            item = entry.name
+            
+            # Поддиректорию архивов отсекаем сравнением имени, без обращения к d_type/stat
+            if item == archive_subdir:
                 continue
-        
-        # Проверяем исключения (точное совпадение имени файла)
-        if exclude_patterns:
-            if item in exclude_patterns:
+            # Сначала дешевые проверки по имени, stat — только для подходящих файлов.
+            # Проверяем исключения (точное совпадение имени файла)
+            if item in exclude_names:
                 continue
-        
-        files_to_archive.append(item_path)
+            
+            if name_re is not None and not name_re.match(item):
+                continue
+            
+            # Пропускаем прочие директории. Как и os.path.isdir раньше, симлинки разыменовываются:
+            # симлинк на файл архивируется, битый симлинк попадет в ошибку stat ниже
+            if entry.is_dir():
+                continue
+            
+            # Проверяем возраст файла
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError as e:
+                logger.error("Ошибка при получении возраста файла %s: %s", entry.path, e)
+                continue
+            if mtime > cutoff_mtime:
+                continue
+            
+            files_to_archive.append((entry.path, item, mtime))
     
     if not files_to_archive:
-        logger.info(f"В {directory} нет файлов старше {ARCHIVE_DAYS_TO_KEEP_UNARCHIVED} дней для архивации.")
+        logger.info("В %s нет файлов старше %s дней для архивации.", directory, ARCHIVE_DAYS_TO_KEEP_UNARCHIVED)
         return
     
     # Группируем по месяцам
     grouped_files = group_files_by_month(files_to_archive)
     
     # Создаем архивы для каждого месяца
-    total_archived = 0
+    to_unlink = []
+    pending = {}
+    compressor = _resolve_compressor()
+    # Один readdir вместо stat на каждый месяц
+    existing_archives = set(os.listdir(archive_dir))
     for (year, month), files in grouped_files.items():
-        archive_name = f"{os.path.basename(directory)}_{year}_{month:02d}.tar.gz"
-        archive_path = os.path.join(archive_dir, archive_name)
+        archive_name = _archive_name(directory, year, month, compressor)
         
-        try:
-            # Если архив уже существует, пропускаем (файлы уже заархивированы)
-            if os.path.exists(archive_path):
-                logger.info(f"Архив {archive_name} уже существует, пропускаем файлы этого месяца")
-                # Удаляем файлы, которые уже в архиве
-                for file_path in files:
-                    try:
-                        os.remove(file_path)
-                        total_archived += 1
-                        logger.info(f"Удален файл (уже в архиве): {os.path.basename(file_path)}")
-                    except Exception as e:
-                        logger.error(f"Ошибка при удалении файла {file_path}: {e}")
-                continue
-            
-            # Создаем новый архив
-            with tarfile.open(archive_path, 'w:gz') as tar:
-                for file_path in files:
-                    arcname = os.path.basename(file_path)
-                    tar.add(file_path, arcname=arcname)
-                    logger.info(f"Добавлен в архив {archive_name}: {arcname}")
-            
-            # Удаляем заархивированные файлы
-            for file_path in files:
+        # Если архив уже существует, пропускаем (файлы уже заархивированы)
+        if archive_name in existing_archives:
+            logger.info("Архив %s уже существует, пропускаем файлы этого месяца", archive_name)
+            # Файлы уже в архиве — удаляем вместе с остальными
+            to_unlink.extend(files)
+            continue
+        
+        pending[(year, month)] = files
+        existing_archives.add(archive_name)
+    
+    # Месяцы независимы: при нескольких месяцах архивируем их параллельно в отдельных потоках,
+    # один месяц — в текущем потоке. Сжатие не держит GIL (pigz — отдельный процесс, zlib и zstandard
+    # отпускают GIL), поэтому процессы не нужны. Потоки компрессора делим между месяцами, чтобы суммарно
+    # не запускать больше потоков, чем ядер
+    cpu_count = os.cpu_count() or 1
+    if len(pending) > 1:
+        workers = min(len(pending), cpu_count)
+        threads = max(1, cpu_count // workers)
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_archive_one_month, directory, archive_dir, year, month, files, compressor, threads):
+                    (files, _archive_name(directory, year, month, compressor))
+                for (year, month), files in pending.items()
+            }
+            for future in as_completed(futures):
+                files, archive_name = futures[future]
                 try:
-                    os.remove(file_path)
-                    total_archived += 1
-                    logger.info(f"Удален заархивированный файл: {os.path.basename(file_path)}")
+                    results.append((files, future.result()))
                 except Exception as e:
-                    logger.error(f"Ошибка при удалении файла {file_path}: {e}")
-            
-            logger.info(f"Создан архив: {archive_path} ({len(files)} файлов)")
-            
-        except Exception as e:
-            logger.error(f"Ошибка при создании архива {archive_path}: {e}")
+                    # Сбой одного месяца не должен прерывать остальные месяцы и директории
+                    results.append((files, (archive_name, [], f"Ошибка при создании архива {archive_name}: {e}")))
+    else:
+        results = [
+            (files, _archive_one_month(directory, archive_dir, year, month, files, compressor, cpu_count))
+            for (year, month), files in pending.items()
+        ]
     
-    logger.info(f"Всего заархивировано и удалено файлов из {directory}: {total_archived}")
+    # Логируем и удаляем в вызывающем потоке, чтобы сообщения разных месяцев не перемешивались
+    for files, (archive_name, added, error) in results:
+        if error:
+            logger.error(error)
+            continue
+        for arcname in added:
+            logger.debug("Добавлен в архив %s: %s", archive_name, arcname)
+        # Одна строка на архив; число удаленных файлов — в итоговой строке по директории
+        if added:
+            logger.info("Создан архив: %s (%d файлов)", os.path.join(archive_dir, archive_name), len(added))
+        to_unlink.extend(files)
+    
+    ok_count, errors = _unlink_many(to_unlink)
+    _log_unlink_summary(directory, ok_count, errors)
 
 
 def cleanup_old_archives(directory, archive_subdir='archive'):
@@ -213,33 +419,39 @@ def cleanup_old_archives(directory, archive_subdir='archive'):
     archive_dir = os.path.join(directory, archive_subdir)
     
     if not os.path.exists(archive_dir):
-        logger.info(f"Директория архивов {archive_dir} не существует. Пропускаю очистку.")
+        logger.info("Директория архивов %s не существует. Пропускаю очистку.", archive_dir)
         return
     
-    cutoff_date = datetime.now() - timedelta(days=ARCHIVE_DAYS_TO_KEEP_ARCHIVED)
+    now_ts = time.time()
+    cutoff_mtime = now_ts - ARCHIVE_DAYS_TO_KEEP_ARCHIVED * 86400
     deleted_count = 0
     
-    for item in os.listdir(archive_dir):
-        item_path = os.path.join(archive_dir, item)
-        
-        if not os.path.isfile(item_path):
-            continue
-        
-        # Проверяем возраст архива
-        age_days = get_file_age_days(item_path)
-        
-        if age_days >= ARCHIVE_DAYS_TO_KEEP_ARCHIVED:
+    with os.scandir(archive_dir) as it:
+        for entry in it:
+            # Как и os.path.isfile раньше, симлинки на файлы тоже считаются архивами
+            if not entry.is_file():
+                continue
+            
+            # Проверяем возраст архива
             try:
-                os.remove(item_path)
-                deleted_count += 1
-                logger.info(f"Удален старый архив ({age_days} дней): {item}")
-            except Exception as e:
-                logger.error(f"Ошибка при удалении архива {item_path}: {e}")
+                mtime = entry.stat().st_mtime
+            except OSError as e:
+                logger.error("Ошибка при получении возраста файла %s: %s", entry.path, e)
+                continue
+            
+            if mtime <= cutoff_mtime:
+                try:
+                    os.remove(entry.path)
+                    deleted_count += 1
+                    age_days = _age_days_from_mtime(mtime, now_ts)
+                    logger.info("Удален старый архив (%d дней): %s", age_days, entry.name)
+                except Exception as e:
+                    logger.error("Ошибка при удалении архива %s: %s", entry.path, e)
     
     if deleted_count > 0:
-        logger.info(f"Удалено старых архивов из {archive_dir}: {deleted_count}")
+        logger.info("Удалено старых архивов из %s: %d", archive_dir, deleted_count)
     else:
-        logger.info(f"В {archive_dir} нет архивов старше {ARCHIVE_DAYS_TO_KEEP_ARCHIVED} дней.")
+        logger.info("В %s нет архивов старше %s дней.", archive_dir, ARCHIVE_DAYS_TO_KEEP_ARCHIVED)
 
 
 def run_archive_cleanup():
@@ -253,8 +465,8 @@ def run_archive_cleanup():
     
     logger.info("="*60)
     logger.info("Запуск процесса архивации и очистки")
-    logger.info(f"Настройки: неархивированные файлы хранятся {ARCHIVE_DAYS_TO_KEEP_UNARCHIVED} дней, "
-                f"архивы {ARCHIVE_DAYS_TO_KEEP_ARCHIVED} дней")
+    logger.info("Настройки: неархивированные файлы хранятся %s дней, архивы %s дней",
+                ARCHIVE_DAYS_TO_KEEP_UNARCHIVED, ARCHIVE_DAYS_TO_KEEP_ARCHIVED)
     logger.info("="*60)
     
     try:
@@ -263,7 +475,7 @@ def run_archive_cleanup():
         archive_directory_files(
             directory=REPORTS_DIR,
             archive_subdir='archive',
-            file_patterns=['.md'],
+            file_patterns=['*.md'],
             exclude_patterns=['baseline_report.md']
         )
         
@@ -277,7 +489,7 @@ def run_archive_cleanup():
             archive_directory_files(
                 directory=cpu_events_dir,
                 archive_subdir='archive',
-                file_patterns=['.csv'],
+                file_patterns=['*.csv'],
                 exclude_patterns=[]
             )
             cleanup_old_archives(cpu_events_dir, 'archive')
@@ -289,7 +501,7 @@ def run_archive_cleanup():
             archive_directory_files(
                 directory=memory_events_dir,
                 archive_subdir='archive',
-                file_patterns=['.csv'],
+                file_patterns=['*.csv'],
                 exclude_patterns=[]
             )
             cleanup_old_archives(memory_events_dir, 'archive')
@@ -299,7 +511,7 @@ def run_archive_cleanup():
         archive_directory_files(
             directory=LOGS_DIR,
             archive_subdir='archive',
-            file_patterns=['.log'],  # Любые файлы с .log в названии
+            file_patterns=['*.log', '*.log.*'],  # Логи и их ротации (mysql_perf_reporter.log.20250627)
             exclude_patterns=['mysql_perf_reporter.log']  # Исключаем только текущий активный лог
         )
         
@@ -311,7 +523,7 @@ def run_archive_cleanup():
         logger.info("="*60 + "\n")
         
     except Exception as e:
-        logger.error(f"Критическая ошибка при архивации: {e}", exc_info=True)
+        logger.error("Критическая ошибка при архивации: %s", e, exc_info=True)
 
 
 if __name__ == '__main__':
@@ -6,6 +6,10 @@ OUTPUT_CSV = 'reports/events_cpu_fixed.csv'
 
 # Регулярка для парсинга одной строки processlist
 PROCESS_ROW_RE = re.compile(r'\|\s*(\d+)\s*\|\s*([^|]+)\|\s*([^|]+)\|\s*([^|]+)\|\s*([^|]+)\|\s*(\d+)\s*\|\s*([^|]+)\|\s*(.*?)\s*\|')
+# Любые пробельные символы (в т.ч. \n, \r, \t) схлопываем в один пробел
+_WS_RE = re.compile(r'\s+')
+# Сколько строк копим перед записью в файл
+WRITE_BATCH_SIZE = 1000
 
 def extract_queries(process_list):
     """
@@ -18,44 +22,44 @@ def extract_queries(process_list):
         user = match.group(2).strip()
         host = match.group(3).strip()
         time_val = match.group(6).strip()
-        info = match.group(8).strip().replace('\n', ' ').replace('\r', ' ')
-        info = re.sub(r'\s+', ' ', info)
+        info = _WS_RE.sub(' ', match.group(8).strip())
         if info and info != 'NULL':
             queries.append({'user': user, 'host': host, 'time_query': time_val, 'info': info})
     return queries
 
 def main():
     with open(INPUT_CSV, newline='', encoding='utf-8') as infile, \
-         open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as outfile:
-        reader = csv.reader(infile)
-        header = next(reader)
+         open(OUTPUT_CSV, 'w', newline='', encoding='utf-8', buffering=1 << 20) as outfile:
+        rows = csv.reader(infile)
+        header = next(rows, [])
+        header_lower = [h.lower() for h in header]
         # Определяем, есть ли старый формат (process_list/performance_analysis) или уже плоский
-        if 'process_list' in [h.lower() for h in header] or 'performance_analysis' in [h.lower() for h in header]:
+        if 'process_list' in header_lower or 'performance_analysis' in header_lower:
             # Старый формат: преобразуем
             fieldnames = ['date', 'time', 'pid', 'cpu', 'user', 'host', 'time_query', 'info']
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-            writer.writeheader()
-            for row in csv.DictReader([','.join(header)] + [','.join(r) for r in reader]):
+            writer = csv.writer(outfile, quoting=csv.QUOTE_ALL)
+            writer.writerow(fieldnames)
+            # csv.reader уже прочитал ровно строку заголовка, DictReader продолжает с первой строки данных
+            reader = csv.DictReader(infile, fieldnames=header)
+            batch = []
+            for row in reader:
                 process_list = row.get('process_list', '')
                 if process_list:
                     queries = extract_queries(process_list)
                     for q in queries:
-                        writer.writerow({
-                            'date': row['date'],
-                            'time': row['time'],
-                            'pid': row['pid'],
-                            'cpu': row['cpu'],
-                            'user': q['user'],
-                            'host': q['host'],
-                            'time_query': q['time_query'],
-                            'info': q['info'],
-                        })
+                        batch.append((
+                            row['date'], row['time'], row['pid'], row['cpu'],
+                            q['user'], q['host'], q['time_query'], q['info'],
+                        ))
+                    if len(batch) >= WRITE_BATCH_SIZE:
+                        writer.writerows(batch)
+                        batch.clear()
+            writer.writerows(batch)
         else:
-            # Уже плоский формат: просто копируем
+            # Уже плоский формат: просто копируем строки как есть, без разбора в dict
             writer = csv.writer(outfile, quoting=csv.QUOTE_ALL)
             writer.writerow(header)
-            for row in reader:
-                writer.writerow(row)
+            writer.writerows(rows)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
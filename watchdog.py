@@ -9,76 +9,151 @@ CHECK_INTERVAL = 60  # секунд
 HEARTBEAT_TIMEOUT = 120  # секунд
 
 
+TAIL_WINDOW = 32 * 1024  # байт, начальный размер хвоста лога
+TAIL_WINDOW_MAX = 512 * 1024  # байт, до скольких расширяем окно, если heartbeat не найден
+
+
+def _read_tail_lines(f, size, window):
+    """Читает последние window байт лога и возвращает полные строки."""
+    offset = max(0, size - window)
+    f.seek(offset)
+    lines = f.read().decode('utf-8', 'replace').splitlines()
+    # Первая строка окна обрезана посередине, если читаем не с начала файла
+    if offset > 0 and lines:
+        lines = lines[1:]
+    return lines
+
+
+def _parse_log_timestamp(line):
+    """
+    Разбирает метку времени в начале строки лога фиксированного формата
+    'YYYY-MM-DD HH:MM:SS,mmm' срезами, без strptime.
+    """
+    if len(line) < 23 or line[4] != '-' or line[10] != ' ' or line[19] != ',':
+        raise ValueError(f"Неожиданный формат времени: {line[:23]!r}")
+    return datetime(
+        int(line[0:4]), int(line[5:7]), int(line[8:10]),
+        int(line[11:13]), int(line[14:16]), int(line[17:19]),
+        int(line[20:23]) * 1000,
+    )
+
+
 def find_last_heartbeat():
     if not os.path.exists(LOG_PATH):
         return None
     try:
-        with open(LOG_PATH, 'r', encoding='utf-8') as f:
-            lines = f.readlines()[-200:]
-        for line in reversed(lines):
-            if HEARTBEAT_STR in line:
-                # Пример: 2025-06-24 05:00:41,868 [INFO] HEARTBEAT: ...
-                try:
-                    ts_str = line.split(' [')[0]
-                    ts = datetime.strptime(ts_str, '%Y-%m-%d %H:%M:%S,%f')
-                    return ts
-                except Exception:
-                    continue
-        return None
+        # Лог только дописывается: читаем хвост, а не весь файл
+        with open(LOG_PATH, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            window = TAIL_WINDOW
+            while True:
+                lines = _read_tail_lines(f, size, window)
+                for line in reversed(lines):
+                    if HEARTBEAT_STR in line:
+                        # Пример: 2025-06-24 05:00:41,868 [INFO] HEARTBEAT: ...
+                        try:
+                            return _parse_log_timestamp(line)
+                        except ValueError:
+                            continue
+                if window >= size or window >= TAIL_WINDOW_MAX:
+                    return None
+                window *= 2
     except Exception as e:
         print(f"[WATCHDOG] Ошибка при чтении лога: {e}")
         return None
 
-def kill_main_process():
-    # Используем /proc для поиска процессов вместо ps
-    import subprocess
+# PID процесса main.py, найденный при последнем сканировании /proc
+_cached_pid = None
+
+
+def _is_main_cmdline(pid):
+    """Проверяет по /proc/<pid>/cmdline, что это процесс main.py (не сам watchdog)."""
     try:
-        # Сначала пробуем найти процесс через /proc
-        for pid_dir in os.listdir('/proc'):
-            if pid_dir.isdigit():
-                try:
-                    cmdline_path = f'/proc/{pid_dir}/cmdline'
-                    if os.path.exists(cmdline_path):
-                        with open(cmdline_path, 'r') as f:
-                            cmdline = f.read()
-                            if 'python' in cmdline and 'main.py' in cmdline and 'watchdog' not in cmdline:
-                                pid = int(pid_dir)
-                                print(f"[WATCHDOG] Завершаю процесс main.py, PID={pid}")
-                                os.kill(pid, 9)
-                                return True
-                except (IOError, OSError, ValueError):
-                    continue
-        
-        # Если не нашли через /proc, пробуем через ps (если доступен)
-        try:
-            out = subprocess.check_output(["ps", "aux"]).decode()
-            for line in out.splitlines():
-                if 'python' in line and 'main.py' in line and 'watchdog' not in line:
-                    pid = int(line.split()[1])
-                    print(f"[WATCHDOG] Завершаю процесс main.py, PID={pid}")
-                    os.kill(pid, 9)
-                    return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
-            
-        print("[WATCHDOG] Не найден процесс main.py для завершения.")
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            cmdline = f.read(4096)
+    except OSError:
+        # Процесса уже нет
         return False
+    return b'python' in cmdline and b'main.py' in cmdline and b'watchdog' not in cmdline
+
+
+def _find_main_pid():
+    """Ищет PID main.py сканированием /proc и запоминает его."""
+    global _cached_pid
+    # В контейнере /proc доступен всегда; scandir не делает лишних stat
+    with os.scandir('/proc') as it:
+        for entry in it:
+            if entry.name.isdigit() and _is_main_cmdline(entry.name):
+                _cached_pid = int(entry.name)
+                return _cached_pid
+    _cached_pid = None
+    return None
+
+
+def kill_main_process():
+    global _cached_pid
+    try:
+        # Сначала проверяем запомненный PID: PID мог быть переиспользован, поэтому сверяем cmdline
+        pid = _cached_pid if _cached_pid is not None and _is_main_cmdline(_cached_pid) else _find_main_pid()
+        if pid is None:
+            print("[WATCHDOG] Не найден процесс main.py для завершения.")
+            return False
+        print(f"[WATCHDOG] Завершаю процесс main.py, PID={pid}")
+        os.kill(pid, 9)
+        # После перезапуска у main.py будет другой PID
+        _cached_pid = None
+        return True
     except Exception as e:
         print(f"[WATCHDOG] Ошибка при завершении процесса: {e}")
         return False
 
+def _log_mtime():
+    """Время последней записи в лог или None, если лога нет."""
+    try:
+        return os.stat(LOG_PATH).st_mtime
+    except OSError:
+        return None
+
+
 def main():
     print("[WATCHDOG] Старт watchdog...")
+    try:
+        pid = _find_main_pid()
+        print(f"[WATCHDOG] Процесс main.py: PID={pid}")
+    except OSError as e:
+        print(f"[WATCHDOG] Не удалось просканировать /proc: {e}")
+    # Расписание проверок по monotonic: не дрейфует от времени самой проверки и не зависит от переводов часов
+    next_check = time.monotonic()
+    # Последний найденный heartbeat. Новые heartbeat только моложе, поэтому пока он моложе
+    # HEARTBEAT_TIMEOUT - CHECK_INTERVAL, процесс заведомо жив и хвост лога не читаем
+    last_heartbeat = None
     while True:
-        last_heartbeat = find_last_heartbeat()
-        now = datetime.now()
-        if last_heartbeat is None or (now - last_heartbeat).total_seconds() > HEARTBEAT_TIMEOUT:
-            print(f"[WATCHDOG] Не найден свежий heartbeat! Последний: {last_heartbeat}. Перезапуск...")
+        log_mtime = _log_mtime()
+        if log_mtime is not None and time.time() - log_mtime > HEARTBEAT_TIMEOUT:
+            # Лог давно не менялся — свежего heartbeat в нем быть не может, хвост не читаем
+            print(f"[WATCHDOG] Лог не обновлялся {int(time.time() - log_mtime)} сек. Перезапуск...")
+            restart = True
+        else:
+            now = datetime.now()
+            if last_heartbeat is None or (now - last_heartbeat).total_seconds() >= HEARTBEAT_TIMEOUT - CHECK_INTERVAL:
+                last_heartbeat = find_last_heartbeat()
+            restart = last_heartbeat is None or (now - last_heartbeat).total_seconds() > HEARTBEAT_TIMEOUT
+            if restart:
+                print(f"[WATCHDOG] Не найден свежий heartbeat! Последний: {last_heartbeat}. Перезапуск...")
+            else:
+                print(f"[WATCHDOG] Всё ок. Последний heartbeat: {last_heartbeat}")
+        if restart:
             kill_main_process()
+            last_heartbeat = None
             time.sleep(10)
-        else:
-            print(f"[WATCHDOG] Всё ок. Последний heartbeat: {last_heartbeat}")
-        time.sleep(CHECK_INTERVAL)
+            # Интервал до следующей проверки отсчитываем после паузы: main.py нужно время на перезапуск
+            next_check = time.monotonic()
+        next_check += CHECK_INTERVAL
+        now_mono = time.monotonic()
+        if next_check < now_mono:
+            # Проверка затянулась дольше интервала — не навёрстываем пропущенные тики
+            next_check = now_mono
+        time.sleep(next_check - now_mono)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file